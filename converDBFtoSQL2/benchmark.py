@@ -0,0 +1,420 @@
+import os
+import io
+import json
+import time
+import random
+import struct
+import argparse
+import platform
+import datetime
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from dbf_reader import DBFReader, JULIAN_OFFSET, numpy
+from dbf_to_sql import (load_structure, sanitize_record, build_converters, record_pipeline,
+                        write_insert_batch, open_output, dbf_to_sql, peak_rss_mb, input_bytes)
+
+# Esquemas de las tablas sintéticas: versión del DBF y campos (nombre, tipo, longitud, decimales, opciones)
+SCHEMAS = {
+    # dBase III con los memos en .DBT
+    'dbase': (0x83, [
+        ('CODIGO', 'C', 10, 0, 0),
+        ('NOMBRE', 'C', 40, 0, 0),
+        ('IMPORTE', 'N', 12, 2, 0),
+        ('CANTIDAD', 'N', 8, 0, 0),
+        ('FECHA', 'D', 8, 0, 0),
+        ('ACTIVO', 'L', 1, 0, 0),
+        ('NOTAS', 'M', 10, 0, 0),
+    ]),
+    # Visual FoxPro con los memos en .FPT, campos que admiten NULL y un V de longitud variable
+    'vfp': (0x30, [
+        ('CODIGO', 'C', 10, 0, 0),
+        ('NOMBRE', 'V', 40, 0, 0x02),
+        ('IMPORTE', 'Y', 8, 4, 0),
+        ('PESO', 'B', 8, 2, 0),
+        ('CANTIDAD', 'I', 4, 0, 0x02),
+        ('ALTA', 'T', 8, 0, 0),
+        ('FECHA', 'D', 8, 0, 0x02),
+        ('NOTAS', 'M', 4, 0, 0),
+        ('_NullFlags', '0', 1, 0, 0x05),
+    ]),
+}
+
+# Textos que han dado problemas: comillas, barras, nulos, saltos de línea, espacios y acentos
+PATHOLOGICAL_TEXT = [
+    "O'Brien", "C:\\ruta\\al\\archivo", "nulo\x00en medio", "línea\r\notra línea",
+    "  espacios   de   más  ", "comillas ''dobles''", "tabulador\taquí", "acaba en comilla'",
+    "ÑANDÚ CAÑÓN", "\\'", "'", "", "   ",
+]
+WORDS = ["contenedor", "cliente", "entrada", "salida", "reparación", "puerto", "almacén",
+         "MSKU", "TCLU", "revisión", "precinto", "grúa"]
+
+# Resultados de referencia guardados en el repositorio (ver --save y --compare)
+BASELINE_FILE = 'benchmark_baseline.json'
+STAGES = ('read', 'sanitize', 'render', 'write')
+
+
+def random_text(rng, max_length):
+    """Texto de prueba: normalmente palabras, a veces uno de los casos problemáticos"""
+    if rng.random() < 0.2:
+        text = rng.choice(PATHOLOGICAL_TEXT)
+    else:
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 6)))
+    return text[:max_length]
+
+
+class MemoWriter:
+    """Escribe los memos de la tabla sintética como .FPT (FoxPro) o .DBT (dBase III)"""
+
+    def __init__(self, foxpro, block_size=64):
+        self.foxpro = foxpro
+        self.block_size = block_size if foxpro else 512
+        self.data = bytearray(512)
+
+    def add(self, text):
+        """Añade un memo y devuelve su bloque (0 si está vacío)"""
+        if not text:
+            return 0
+        while len(self.data) % self.block_size:
+            self.data.append(0)
+        block = len(self.data) // self.block_size
+        if self.foxpro:
+            self.data += struct.pack('>II', 1, len(text)) + text
+        else:
+            self.data += text + b'\x1a\x1a'
+        return block
+
+    def save(self, path):
+        next_block = -(-len(self.data) // self.block_size)
+        if self.foxpro:
+            struct.pack_into('>IHH', self.data, 0, next_block, 0, self.block_size)
+        else:
+            struct.pack_into('<I', self.data, 0, next_block)
+        with open(path, 'wb') as f:
+            f.write(self.data)
+
+
+def encode_field(rng, type_char, length, decimal, memo, encoding):
+    """Bytes de un campo con un valor aleatorio; None si el valor es NULL"""
+    if type_char not in ('L', 'M') and rng.random() < 0.05:
+        return None
+    if type_char in ('C', 'V'):
+        return random_text(rng, length).encode(encoding, errors='replace')
+    if type_char == 'N':
+        if decimal:
+            return f"{rng.uniform(-99999, 99999):.{decimal}f}".encode('ascii').rjust(length)
+        return str(rng.randint(0, 10 ** min(length, 9) - 1)).encode('ascii').rjust(length)
+    if type_char == 'D':
+        day = datetime.date(1995, 1, 1) + datetime.timedelta(days=rng.randint(0, 11000))
+        return day.strftime('%Y%m%d').encode('ascii')
+    if type_char == 'L':
+        return bytes([rng.choice(b'TFYN? ')])
+    if type_char == 'I':
+        return struct.pack('<i', rng.randint(-2 ** 31, 2 ** 31 - 1))
+    if type_char == 'Y':
+        return struct.pack('<q', rng.randint(-10 ** 12, 10 ** 12))
+    if type_char == 'B':
+        return struct.pack('<d', rng.uniform(-1e6, 1e6))
+    if type_char == 'T':
+        day = datetime.date(2000, 1, 1).toordinal() + JULIAN_OFFSET + rng.randint(0, 9000)
+        return struct.pack('<II', day, rng.randint(0, 86399) * 1000)
+    if type_char == 'M':
+        # La mayoría cortos, algunos vacíos y alguno grande
+        roll = rng.random()
+        if roll < 0.2:
+            text = ''
+        elif roll < 0.99:
+            text = '\r\n'.join(random_text(rng, 200) for _ in range(rng.randint(1, 10)))
+        else:
+            text = random_text(rng, 200) * 2000
+        block = memo.add(text.encode(encoding, errors='replace'))
+        return struct.pack('<I', block) if length == 4 else str(block or '').encode('ascii').rjust(length)
+    return b''
+
+
+def generate_dbf(path, rows, schema='dbase', seed=1, deleted_ratio=0.02, encoding='latin1'):
+    """Genera una tabla DBF sintética de rows registros (y su archivo de memos).
+
+    Los datos son aleatorios pero reproducibles con la misma semilla;
+    incluyen textos problemáticos (PATHOLOGICAL_TEXT), valores NULL en los
+    campos VFP que los admiten, memos vacíos y grandes, y un deleted_ratio
+    de registros borrados.
+    """
+    version, fields = SCHEMAS[schema]
+    rng = random.Random(seed)
+    foxpro = version == 0x30
+    record_length = 1 + sum(length for _, _, length, _, _ in fields)
+    # Visual FoxPro reserva 263 bytes tras los descriptores para el contenedor de base de datos
+    header_length = 32 + 32 * len(fields) + 1 + (263 if foxpro else 0)
+    today = datetime.date.today()
+    header = struct.pack('<BBBBIHH', version, today.year % 100, today.month, today.day,
+                         rows, header_length, record_length) + b'\0' * 20
+    offset = 1
+    for name, type_char, length, decimal, flags in fields:
+        header += (name.encode('ascii').ljust(11, b'\0') + type_char.encode('ascii') +
+                   struct.pack('<I', offset) + bytes([length, decimal, flags]) + b'\0' * 13)
+        offset += length
+    header = (header + b'\r').ljust(header_length, b'\0')
+
+    # Bits de _NullFlags en el mismo orden en que los asigna DBFReader
+    bits = {}
+    for name, type_char, _, _, flags in fields:
+        if flags & 0x01:
+            continue
+        if flags & 0x02:
+            bits[name, 'null'] = len(bits)
+        if type_char == 'V':
+            bits[name, 'length'] = len(bits)
+
+    memo = MemoWriter(foxpro)
+    with open(path, 'wb') as f:
+        f.write(header)
+        for _ in range(rows):
+            record = bytearray(b'*' if rng.random() < deleted_ratio else b' ')
+            nullflags = 0
+            for name, type_char, length, decimal, flags in fields:
+                if type_char == '0':
+                    record += nullflags.to_bytes(length, 'little')
+                    continue
+                data = encode_field(rng, type_char, length, decimal, memo, encoding)
+                if data is None:
+                    if (name, 'null') in bits:
+                        nullflags |= 1 << bits[name, 'null']
+                    data = b''
+                if type_char == 'V' and len(data) < length:
+                    # V sin llenar: la longitud real va en el último byte
+                    nullflags |= 1 << bits[name, 'length']
+                    data = data.ljust(length - 1, b'\0') + bytes([len(data)])
+                elif type_char in ('I', 'Y', 'B', 'T'):
+                    data = data.ljust(length, b'\0')
+                record += data.ljust(length, b' ')
+            f.write(record)
+        f.write(b'\x1a')
+    if any(type_char == 'M' for _, type_char, _, _, _ in fields):
+        memo.save(os.path.splitext(path)[0] + ('.fpt' if foxpro else '.dbt'))
+    return path
+
+
+def throughput(rows, size, seconds):
+    return {
+        'seconds': round(seconds, 4),
+        'rows_per_s': round(rows / seconds) if seconds else None,
+        'mb_per_s': round(size / 1048576 / seconds, 2) if seconds else None,
+    }
+
+
+def measure_stages(dbf_path, batch_size=100):
+    """Tiempo de cada etapa por separado, cada una sobre el resultado de la anterior:
+    lectura (decodificar los registros), sanitización, render de los INSERT y escritura."""
+    field_specs = load_structure(dbf_path)
+    field_names = [name for name, _, _, _ in field_specs]
+    fields_str = f"`{'`, `'.join(field_names)}`"
+    table_name = os.path.splitext(os.path.basename(dbf_path))[0]
+    size = input_bytes(dbf_path)
+    results = {}
+
+    start = time.perf_counter()
+    with DBFReader(dbf_path, encoding='latin1', char_decode_errors='replace') as table:
+        records, converters = record_pipeline(table, field_specs, with_index=True)
+        records = list(records)
+        rows = len(records)
+        results['read'] = throughput(rows, size, time.perf_counter() - start)
+
+        # Los memos se leen al sanitizar, así que el archivo tiene que seguir abierto
+        start = time.perf_counter()
+        values = [sanitize_record(record, field_specs, number, converters) for number, record in records]
+        results['sanitize'] = throughput(rows, size, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    rendered = io.StringIO()
+    for i in range(0, rows, batch_size):
+        write_insert_batch(rendered, table_name, fields_str,
+                           [f"({', '.join(row)})" for row in values[i:i + batch_size]])
+    rendered = rendered.getvalue()
+    results['render'] = throughput(rows, size, time.perf_counter() - start)
+
+    output = f"{dbf_path}.bench.sql"
+    start = time.perf_counter()
+    with open_output(output) as f:
+        f.write(rendered)
+    results['write'] = throughput(rows, size, time.perf_counter() - start)
+    os.remove(output)
+
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+def measure_end_to_end(dbf_path, batch_size=100):
+    """dbf_to_sql completo, como lo ejecuta el usuario (sin sus mensajes)"""
+    field_specs = load_structure(dbf_path)
+    table_name = os.path.splitext(os.path.basename(dbf_path))[0]
+    output = f"{dbf_path}.bench.sql"
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = dbf_to_sql(dbf_path, output, table_name, field_specs, batch_size=batch_size)
+    result = throughput(rows, input_bytes(dbf_path), time.perf_counter() - start)
+    result['rows'] = rows
+    result['output_mb'] = round(os.path.getsize(output) / 1048576, 2)
+    os.remove(output)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def in_child(function, *args):
+    """Ejecuta una medida en un proceso nuevo para que la memoria máxima sea solo la suya"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(function, *args).result()
+
+def run_suite(dbf_paths, batch_size=100, repeat=3):
+    """Mejor de repeat ejecuciones por etapas y de extremo a extremo de cada tabla"""
+    results = {}
+    for dbf_path in dbf_paths:
+        print(f"Midiendo {dbf_path}...")
+        stages = [in_child(measure_stages, dbf_path, batch_size) for _ in range(repeat)]
+        runs = [in_child(measure_end_to_end, dbf_path, batch_size) for _ in range(repeat)]
+        best = {stage: min((s[stage] for s in stages), key=lambda r: r['seconds']) for stage in STAGES}
+        best['peak_rss_mb'] = stages[0]['peak_rss_mb']
+        results[os.path.basename(dbf_path)] = {
+            'input_mb': round(input_bytes(dbf_path) / 1048576, 2),
+            'stages': best,
+            'end_to_end': min(runs, key=lambda r: r['seconds']),
+        }
+    return results
+
+def print_results(results, baseline=None):
+    """Tabla de resultados; con baseline añade la velocidad relativa (x1.10 = un 10% más rápido)"""
+    print(f"\n{'Tabla':<28} {'Etapa':<10} {'Registros/s':>12} {'MB/s':>8} {'Segundos':>9} {'vs ref':>7}")
+    for name, result in results.items():
+        reference = (baseline or {}).get(name)
+        rows = [(stage, result['stages'][stage]) for stage in STAGES]
+        rows.append(('total', result['end_to_end']))
+        for stage, r in rows:
+            compare = ''
+            if reference:
+                old = reference['end_to_end'] if stage == 'total' else reference['stages'].get(stage)
+                if old and r['seconds']:
+                    compare = f"x{old['seconds'] / r['seconds']:.2f}"
+            print(f"{name:<28} {stage:<10} {r['rows_per_s'] or 0:>12} {r['mb_per_s'] or 0:>8} "
+                  f"{r['seconds']:>9.3f} {compare:>7}")
+        end = result['end_to_end']
+        print(f"{name:<28} {'memoria':<10} máximo {end['peak_rss_mb']} MB de extremo a extremo, "
+              f"{result['stages']['peak_rss_mb']} MB por etapas; salida de {end['output_mb']} MB")
+
+
+def time_rows(records, field_specs, converters=None, repeat=3):
+    """Mejor tiempo de sanitizar todos los registros (en segundos)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for number, record in enumerate(records, 1):
+            sanitize_record(record, field_specs, number, converters)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def compare_sanitize(dbf_path):
+    """Compara sanitize_value por celda, los conversores por columna y el texto en modo bytes"""
+    field_specs = load_structure(dbf_path)
+    field_names = [name for name, _, _, _ in field_specs]
+
+    # Leer los registros antes para medir solo la sanitización
+    with DBFReader(dbf_path) as table:
+        records = list(table.iter_records(field_names))
+        raw_records, raw_converters = record_pipeline(table, field_specs, vectorized=False)
+        raw_records = list(raw_records)
+    print(f"{dbf_path}: {len(records)} registros, {len(field_specs)} campos")
+
+    converters = build_converters(field_specs)
+    # Comprobar que todos los caminos generan exactamente lo mismo
+    for number, (record, raw_record) in enumerate(zip(records, raw_records), 1):
+        expected = sanitize_record(record, field_specs, number)
+        if (expected != sanitize_record(record, field_specs, number, converters) or
+                expected != sanitize_record(raw_record, field_specs, number, raw_converters)):
+            print(f"Diferencia en el registro {number}")
+            return
+
+    generic = time_rows(records, field_specs)
+    compiled = time_rows(records, field_specs, converters)
+    raw = time_rows(raw_records, field_specs, raw_converters)
+    print(f"sanitize_value por celda: {len(records) / generic:>10.0f} registros/s")
+    print(f"Conversores por columna:  {len(records) / compiled:>10.0f} registros/s (x{generic / compiled:.2f})")
+    print(f"Texto en modo bytes:      {len(records) / raw:>10.0f} registros/s (x{generic / raw:.2f})")
+
+    # Con numpy la conversión de N, F y D pasa a la lectura: se mide lectura y sanitización juntas
+    if numpy is not None:
+        scalar = time_pipeline(dbf_path, field_specs, vectorized=False)
+        vectorized = time_pipeline(dbf_path, field_specs, vectorized=True)
+        print(f"Lectura y sanitización campo a campo:       {len(records) / scalar:>10.0f} registros/s")
+        print(f"Lectura y sanitización con N/D por bloques: {len(records) / vectorized:>10.0f} registros/s "
+              f"(x{scalar / vectorized:.2f})")
+
+def time_pipeline(dbf_path, field_specs, vectorized, repeat=3):
+    """Mejor tiempo de leer y sanitizar todos los registros con record_pipeline (en segundos)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with DBFReader(dbf_path, encoding='latin1', char_decode_errors='replace') as table:
+            records, converters = record_pipeline(table, field_specs, with_index=True, vectorized=vectorized)
+            for number, record in records:
+                sanitize_record(record, field_specs, number, converters)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mide la velocidad de la conversión DBF -> SQL",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"Referencia versionada: {BASELINE_FILE} (contenid.DBF y las tablas sintéticas de\n"
+               f"20000 registros con la semilla 1, --batch-size 100). Para compararse con ella:\n"
+               f"  python benchmark.py contenid.DBF --synthetic 20000 --compare {BASELINE_FILE}\n"
+               f"Los tiempos dependen de la máquina: vuelve a guardarla con --save al cambiar de equipo.")
+    parser.add_argument('tablas', nargs='*', help="Tablas DBF a medir (por defecto contenid.DBF)")
+    parser.add_argument('--synthetic', type=int, metavar='REGISTROS',
+                        help="Generar y medir también tablas sintéticas de este número de registros")
+    parser.add_argument('--schema', choices=sorted(SCHEMAS), action='append',
+                        help="Esquema de las tablas sintéticas (se puede repetir; por defecto todos)")
+    parser.add_argument('--synthetic-dir', default='bench_data', help="Directorio de las tablas sintéticas")
+    parser.add_argument('--seed', type=int, default=1, help="Semilla de los datos sintéticos")
+    parser.add_argument('--batch-size', type=int, default=100, help="Registros por INSERT")
+    parser.add_argument('--repeat', type=int, default=3, help="Ejecuciones de cada medida (se toma la mejor)")
+    parser.add_argument('--save', metavar='JSON', help="Guardar los resultados como referencia")
+    parser.add_argument('--compare', metavar='JSON', help="Comparar con una referencia guardada")
+    parser.add_argument('--sanitize', action='store_true',
+                        help="Solo comparar los caminos de sanitización (y comprobar que dan lo mismo)")
+    args = parser.parse_args()
+
+    dbf_paths = list(args.tablas)
+    if args.synthetic:
+        os.makedirs(args.synthetic_dir, exist_ok=True)
+        for schema in args.schema or sorted(SCHEMAS):
+            path = os.path.join(args.synthetic_dir, f"sintetica_{schema}_{args.synthetic}.dbf")
+            print(f"Generando {path}...")
+            dbf_paths.append(generate_dbf(path, args.synthetic, schema, args.seed))
+    if not dbf_paths:
+        dbf_paths = ['contenid.DBF']
+
+    if args.sanitize:
+        for dbf_path in dbf_paths:
+            compare_sanitize(dbf_path)
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf8') as f:
+            baseline = json.load(f)['results']
+    results = run_suite(dbf_paths, args.batch_size, args.repeat)
+    print_results(results, baseline)
+
+    if args.save:
+        report = {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'batch_size': args.batch_size,
+            'results': results,
+        }
+        with open(args.save, 'w', encoding='utf8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nReferencia guardada en {args.save}")
+
+if __name__ == "__main__":
+    main()
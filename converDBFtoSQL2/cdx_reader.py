@@ -0,0 +1,225 @@
+import mmap
+import struct
+import datetime
+from collections import namedtuple
+
+# Etiqueta del índice compuesto: offset es la posición de su cabecera en el .CDX
+CDXTag = namedtuple('CDXTag', ['name', 'offset', 'root', 'key_length', 'options',
+                               'descending', 'expression', 'for_expression', 'collation'])
+
+NODE_SIZE = 512
+HEADER_SIZE = 1024
+# Cabecera: nodo raíz, lista libre, versión, longitud de clave, opciones, firma
+HEADER_FORMAT = '<iiIHBB'
+# Nodo: atributos, nº de claves, hermano izquierdo y derecho
+NODE_FORMAT = '<HHii'
+# Hoja compacta: máscara de registro, de duplicados y de cola, bits de cada uno y bytes por entrada
+LEAF_FORMAT = '<IBBBBBB'
+
+OPTION_UNIQUE = 0x01
+OPTION_FOR = 0x08
+OPTION_COMPACT = 0x20
+OPTION_COMPOUND = 0x40
+
+NODE_LEAF = 0x02
+
+# Diferencia entre el día juliano y el ordinal de date (claves de fecha)
+JULIAN_OFFSET = 1721425
+
+
+def encode_numeric_key(value):
+    """Clave de índice de un valor numérico: double big-endian ordenable byte a byte"""
+    data = bytearray(struct.pack('>d', float(value)))
+    if data[0] & 0x80:
+        # Negativos: se invierten todos los bits
+        return bytes(b ^ 0xFF for b in data)
+    data[0] |= 0x80
+    return bytes(data)
+
+def encode_date_key(value):
+    """Clave de índice de una fecha: el día juliano como numérico"""
+    return encode_numeric_key(value.toordinal() + JULIAN_OFFSET)
+
+def encode_key(value, type_char, key_length, encoding='latin1'):
+    """Clave de índice de un valor según el tipo del campo indexado (N, F, I, B, Y, D o C)"""
+    if type_char in ('N', 'F', 'I', 'B', 'Y'):
+        return encode_numeric_key(value)
+    if type_char == 'D':
+        if not isinstance(value, datetime.date):
+            value = datetime.datetime.strptime(str(value), '%Y-%m-%d').date()
+        return encode_date_key(value)
+    if type_char == 'C':
+        return str(value).encode(encoding)[:key_length].ljust(key_length, b' ')
+    raise ValueError(f"Tipo de clave no soportado: {type_char}")
+
+
+class CDXIndex:
+    """Lector de índices compuestos (.CDX) de FoxPro / Visual FoxPro sobre mmap.
+
+    El archivo empieza con un árbol B cuyas claves son los nombres de las
+    etiquetas y cuyos números de registro apuntan a la cabecera de cada
+    etiqueta. Cada etiqueta es a su vez un árbol B con nodos interiores
+    (clave, registro, hijo) y hojas compactas con las claves comprimidas por
+    prefijo y cola. Solo se leen los nodos que se recorren.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        directory = self._read_tag_header('', 0)
+        if not directory.options & OPTION_COMPOUND:
+            self.close()
+            raise ValueError(f"{path} no es un índice compuesto (.CDX)")
+        self.tags = {}
+        for key, offset in self._walk(directory):
+            name = key.rstrip(b'\0 ').decode('ascii', errors='replace').upper()
+            self.tags[name] = self._read_tag_header(name, offset)
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_tag_header(self, name, offset):
+        """Lee la cabecera de 1024 bytes de una etiqueta (o del directorio de etiquetas)"""
+        mm = self._mm
+        root, _, _, key_length, options, _ = struct.unpack_from(HEADER_FORMAT, mm, offset)
+        descending = struct.unpack_from('<H', mm, offset + 502)[0] == 1
+        key_pool = struct.unpack_from('<H', mm, offset + 510)[0]
+        collation = mm[offset + 0x1EE:offset + 0x1F8].split(b'\0')[0].decode('ascii', errors='replace')
+        expressions = mm[offset + 512:offset + HEADER_SIZE]
+        expression = expressions.split(b'\0')[0].decode('latin1')
+        for_expression = ''
+        if options & OPTION_FOR:
+            for_expression = expressions[key_pool:].split(b'\0')[0].decode('latin1')
+        return CDXTag(name, offset, root, key_length, options, descending,
+                      expression, for_expression, collation or 'MACHINE')
+
+    def tag(self, name):
+        try:
+            return self.tags[name.upper()]
+        except KeyError:
+            raise KeyError(f"El índice {self.path} no tiene la etiqueta {name}. "
+                           f"Etiquetas: {', '.join(sorted(self.tags))}") from None
+
+    def _leaf_keys(self, offset, key_length, trail_byte):
+        """Descomprime las claves de una hoja compacta: lista de (clave, registro)"""
+        mm = self._mm
+        count = struct.unpack_from(NODE_FORMAT, mm, offset)[1]
+        (record_mask, dup_mask, trail_mask, record_bits, dup_bits,
+         _, entry_size) = struct.unpack_from(LEAF_FORMAT, mm, offset + 14)
+        trail_shift = record_bits + dup_bits
+        # Las entradas (registro, duplicados, cola) van desde el principio del
+        # nodo y los bytes de las claves desde el final hacia atrás
+        pos = offset + 24
+        key_pos = offset + NODE_SIZE
+        previous = b''
+        keys = []
+        for _ in range(count):
+            value = int.from_bytes(mm[pos:pos + entry_size], 'little')
+            pos += entry_size
+            dup = (value >> record_bits) & dup_mask
+            trail = (value >> trail_shift) & trail_mask
+            size = key_length - dup - trail
+            key_pos -= size
+            previous = previous[:dup] + mm[key_pos:key_pos + size] + trail_byte * trail
+            keys.append((previous, value & record_mask))
+        return keys
+
+    def _walk(self, tag, low=None, high=None, trail_byte=b'\0'):
+        """Recorre las claves de una etiqueta en orden: (clave, registro).
+
+        low y high (claves ya codificadas, ambos incluidos) limitan el
+        recorrido; con low se baja directamente a la primera hoja que puede
+        contenerlo en lugar de empezar por la de más a la izquierda.
+        trail_byte es el relleno que la hoja omite al final de cada clave:
+        espacios en claves de texto y ceros en las numéricas. Las etiquetas
+        DESCENDING se recorren al revés (_walk_descending).
+        """
+        if tag.descending:
+            yield from self._walk_descending(tag, low, high, trail_byte)
+            return
+        mm = self._mm
+        key_length = tag.key_length
+        entry_size = key_length + 8
+        node = tag.root
+        # Bajar por los nodos interiores: cada entrada lleva la mayor clave de su hijo
+        while True:
+            attributes, count, _, _ = struct.unpack_from(NODE_FORMAT, mm, node)
+            if attributes & NODE_LEAF:
+                break
+            pos = node + 12
+            child = None
+            for _ in range(count):
+                key = mm[pos:pos + key_length]
+                child = struct.unpack_from('>I', mm, pos + key_length + 4)[0]
+                if low is None or key >= low:
+                    break
+                pos += entry_size
+            if child is None:
+                return
+            node = child
+        # Recorrer las hojas por el enlace al hermano derecho
+        while node != -1:
+            for key, recno in self._leaf_keys(node, key_length, trail_byte):
+                if low is not None and key < low:
+                    continue
+                if high is not None and key[:len(high)] > high:
+                    return
+                yield key, recno
+            node = struct.unpack_from(NODE_FORMAT, mm, node)[3]
+
+    def _walk_descending(self, tag, low=None, high=None, trail_byte=b'\0'):
+        """Como _walk, pero de la mayor clave a la menor.
+
+        Las claves de una etiqueta DESCENDING se guardan en orden ascendente
+        y es la etiqueta la que indica que se leen al revés: con high se
+        baja a la última hoja que puede contenerlo y se sigue por el enlace
+        al hermano izquierdo hasta pasar de low.
+        """
+        mm = self._mm
+        key_length = tag.key_length
+        entry_size = key_length + 8
+        node = tag.root
+        while True:
+            attributes, count, _, _ = struct.unpack_from(NODE_FORMAT, mm, node)
+            if attributes & NODE_LEAF:
+                break
+            pos = node + 12
+            child = None
+            for _ in range(count):
+                key = mm[pos:pos + key_length]
+                child = struct.unpack_from('>I', mm, pos + key_length + 4)[0]
+                # El primer hijo cuya mayor clave pasa de high es el último con claves <= high
+                if high is not None and key[:len(high)] > high:
+                    break
+                pos += entry_size
+            if child is None:
+                return
+            node = child
+        while node != -1:
+            for key, recno in reversed(self._leaf_keys(node, key_length, trail_byte)):
+                if high is not None and key[:len(high)] > high:
+                    continue
+                if low is not None and key < low:
+                    return
+                yield key, recno
+            node = struct.unpack_from(NODE_FORMAT, mm, node)[2]
+
+    def iter_keys(self, name, low=None, high=None, trail_byte=b'\0'):
+        """Claves de la etiqueta name en orden de índice: (clave, número de registro desde 1)"""
+        return self._walk(self.tag(name), low, high, trail_byte)
+
+    def record_numbers(self, name, low=None, high=None, trail_byte=b'\0'):
+        """Números de registro (desde 1) en el orden de la etiqueta name"""
+        return [recno for _, recno in self._walk(self.tag(name), low, high, trail_byte)]
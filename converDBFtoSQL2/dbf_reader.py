@@ -0,0 +1,787 @@
+import os
+import re
+import mmap
+import struct
+import operator
+import datetime
+from decimal import Decimal
+from collections import namedtuple, OrderedDict, Counter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # Sin numpy los campos se decodifican siempre uno a uno
+
+# Descriptor de campo: offset es la posición dentro del registro (el byte 0 es la marca de borrado)
+# y flags el byte de opciones de Visual FoxPro (sistema, admite NULL, binario, autoincremento)
+DBFField = namedtuple('DBFField', ['name', 'type', 'offset', 'length', 'decimal', 'flags'], defaults=(0,))
+
+# Cabecera: versión, fecha (aa, mm, dd), nº de registros, longitud de cabecera y de registro
+HEADER_FORMAT = '<BBBBIHH'
+FIELD_DESCRIPTOR_SIZE = 32
+
+# Diferencia entre el día juliano y el ordinal de datetime (campos T)
+JULIAN_OFFSET = 1721425
+
+# Opciones de campo de Visual FoxPro
+FIELD_SYSTEM = 0x01
+FIELD_NULLABLE = 0x02
+# Tipos de longitud variable de Visual FoxPro: su longitud real va en el último byte
+VARLENGTH_TYPES = ('V', 'Q')
+NULLFLAGS_FIELD = '_NullFlags'
+
+# Campos guardados en el archivo de memos: M texto; G, P y W binarios
+MEMO_TYPES = ('M', 'G', 'P', 'W')
+# Versiones de DBF de FoxPro / Visual FoxPro, que usan .FPT en lugar de .DBT
+FOXPRO_VERSIONS = (0x30, 0x31, 0x32, 0xF5, 0xFB)
+# Versiones de dBase IV con memos, que llevan longitud en cada bloque del .DBT
+DBASE_IV_VERSIONS = (0x8B, 0x8E)
+# Tamaño de los trozos al copiar un memo por bloques
+MEMO_CHUNK_SIZE = 64 * 1024
+# Los memos mayores que esto no se guardan en la caché
+MEMO_CACHE_MAX_BYTES = 64 * 1024
+
+
+def parse_char(data, decode):
+    """Texto (C, V): se quitan espacios y nulos finales"""
+    return decode(data.rstrip(b'\0 '))
+
+def parse_raw_text(data, decode):
+    """Texto sin decodificar (modo bytes): solo se quitan espacios y nulos finales"""
+    return data.rstrip(b'\0 ')
+
+def parse_numeric(data, decode):
+    """Numérico (N, F): int, float o None si está vacío"""
+    # En algunos archivos se usa * como relleno
+    data = data.strip().strip(b'*')
+    try:
+        return int(data)
+    except ValueError:
+        if not data.strip():
+            return None
+        # Contemplar la coma decimal
+        return float(data.replace(b',', b'.'))
+
+def parse_date(data, decode):
+    """Fecha (D) en formato AAAAMMDD"""
+    try:
+        return datetime.date(int(data[:4]), int(data[4:6]), int(data[6:8]))
+    except ValueError:
+        # Un campo con solo espacios y/o ceros es NULL
+        if data.strip(b' 0') == b'':
+            return None
+        raise ValueError(f"Fecha no válida {data!r}")
+
+def parse_logical(data, decode):
+    """Lógico (L): True, False o None"""
+    if data in b'TtYy':
+        return True
+    if data in b'FfNn':
+        return False
+    if data in b'? ':
+        return None
+    raise ValueError(f"Valor no válido para campo lógico: {data!r}")
+
+def parse_integer(data, decode):
+    """Entero binario de 4 bytes (I)"""
+    return struct.unpack('<i', data)[0]
+
+def parse_datetime(data, decode):
+    """Fecha/hora (T): día juliano y milisegundos desde medianoche.
+
+    Visual FoxPro guarda los T con precisión de segundos; los milisegundos
+    que sobran (x.999) son error de redondeo y se redondean al segundo.
+    """
+    if not data.strip():
+        return None
+    day, msec = struct.unpack('<LL', data)
+    if not day:
+        return None
+    return datetime.datetime.fromordinal(day - JULIAN_OFFSET) + datetime.timedelta(seconds=round(msec / 1000))
+
+def parse_currency(data, decode):
+    """Moneda (Y): entero de 8 bytes con 4 decimales"""
+    return Decimal(struct.unpack('<q', data)[0]) / 10000
+
+def parse_double(data, decode):
+    """Doble precisión (B, O)"""
+    return struct.unpack('<d', data)[0]
+
+def parse_raw(data, decode):
+    """Campos que se devuelven tal cual (_NullFlags)"""
+    return data
+
+def parse_none(data, decode):
+    """Campos sin soporte en el lector (memos) o inexistentes en el DBF"""
+    return None
+
+FIELD_PARSERS = {
+    'C': parse_char,
+    'V': parse_char,
+    'N': parse_numeric,
+    'F': parse_numeric,
+    'D': parse_date,
+    'L': parse_logical,
+    'I': parse_integer,
+    '+': parse_integer,
+    'T': parse_datetime,
+    '@': parse_datetime,
+    'Y': parse_currency,
+    'B': parse_double,
+    'O': parse_double,
+    '0': parse_raw,
+}
+
+
+# Lenguaje de --where: condiciones CAMPO op valor y CAMPO IS [NOT] EMPTY,
+# combinadas con AND, OR, NOT y paréntesis. Los valores de texto pueden ir entre comillas.
+WHERE_TOKEN = re.compile(r"""\s*('(?:[^']|'')*'|"[^"]*"|<=|>=|!=|<>|=|<|>|\(|\)|[^\s=<>!()'"]+)""")
+WHERE_OPERATORS = {
+    '=': operator.eq, '!=': operator.ne, '<>': operator.ne,
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+# Bytes que se consideran vacíos en cada tipo (como EMPTY() en xBase)
+EMPTY_BYTES = {'D': b' 0\0', 'L': b' ?\0', 'M': b' 0\0', 'G': b' 0\0', 'P': b' 0\0', 'W': b' 0\0'}
+
+
+class WhereParser:
+    """Compila una expresión de --where en una función sobre los bytes del registro.
+
+    Las condiciones se evalúan sobre el campo sin decodificar siempre que se
+    puede: texto y fechas se comparan como bytes y los numéricos solo se
+    convierten a número. Un campo vacío no cumple ninguna comparación (como
+    NULL en SQL); para buscarlos está IS EMPTY.
+    """
+
+    def __init__(self, reader, expression):
+        self.reader = reader
+        self.fields = {field.name.upper(): field for field in reader.fields}
+        self.tokens = []
+        pos = 0
+        expression = expression.strip()
+        while pos < len(expression):
+            match = WHERE_TOKEN.match(expression, pos)
+            if not match:
+                raise ValueError(f"Expresión --where no válida cerca de: {expression[pos:]}")
+            self.tokens.append(match.group(1))
+            pos = match.end()
+        self.pos = 0
+
+    def compile(self):
+        predicate = self._or()
+        if self.pos < len(self.tokens):
+            raise ValueError(f"Sobra '{self.tokens[self.pos]}' en la expresión --where")
+        return predicate
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise ValueError("Expresión --where incompleta")
+        self.pos += 1
+        return token
+
+    def _keyword(self, word):
+        token = self._peek()
+        if token is not None and token.upper() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def _or(self):
+        terms = [self._and()]
+        while self._keyword('OR'):
+            terms.append(self._and())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda record: any(term(record) for term in terms)
+
+    def _and(self):
+        factors = [self._not()]
+        while self._keyword('AND'):
+            factors.append(self._not())
+        if len(factors) == 1:
+            return factors[0]
+        return lambda record: all(factor(record) for factor in factors)
+
+    def _not(self):
+        if self._keyword('NOT'):
+            factor = self._not()
+            return lambda record: not factor(record)
+        if self._peek() == '(':
+            self.pos += 1
+            predicate = self._or()
+            if self._next() != ')':
+                raise ValueError("Falta ')' en la expresión --where")
+            return predicate
+        return self._condition()
+
+    def _condition(self):
+        name = self._next()
+        field = self.fields.get(name.upper())
+        if field is None:
+            raise ValueError(f"El campo {name} de --where no existe en la tabla")
+        if self._keyword('IS'):
+            negate = self._keyword('NOT')
+            if not self._keyword('EMPTY'):
+                raise ValueError(f"Se esperaba IS [NOT] EMPTY después de {name}")
+            empty = self._empty(field)
+            return (lambda record: not empty(record)) if negate else empty
+        op = self._next()
+        if op not in WHERE_OPERATORS:
+            raise ValueError(f"Operador no válido en --where: {op}")
+        value = self._next()
+        if value[0] in "'\"":
+            value = value[1:-1].replace("''", "'") if value[0] == "'" else value[1:-1]
+        return self._compare(field, WHERE_OPERATORS[op], value)
+
+    def _value_getter(self, field):
+        """Valor decodificado del campo a partir del registro (para los tipos binarios)"""
+        plan = self.reader.column_plan([field.name])
+        start, end, parser = plan[0]
+        decode = self.reader.decode
+        return lambda record: parser(record[start:end], decode)
+
+    def _empty(self, field):
+        if field.name in self.reader.null_bits or field.type in ('I', '+', 'Y', 'B', 'O', 'T', '@'):
+            get = self._value_getter(field)
+            return lambda record: not get(record)
+        start, end = field.offset, field.offset + field.length
+        blank = EMPTY_BYTES.get(field.type, b' \0')
+        return lambda record: not record[start:end].strip(blank)
+
+    def _compare(self, field, compare, value):
+        start, end = field.offset, field.offset + field.length
+        flagged = field.name in self.reader.null_bits
+        if field.type in ('C', 'V') and not flagged:
+            # Texto: bytes sin los espacios finales, en la codificación de la tabla
+            target = value.encode(self.reader.encoding, errors='replace').rstrip(b' ')
+            def match(record):
+                data = record[start:end].rstrip(b' \0')
+                return bool(data) and compare(data, target)
+            return match
+        if field.type == 'D':
+            # Fechas AAAAMMDD: el orden de los bytes es el de las fechas
+            target = value.replace('-', '').encode('ascii')
+            if len(target) != 8 or not target.isdigit():
+                raise ValueError(f"Fecha no válida en --where: {value} (AAAA-MM-DD)")
+            def match(record):
+                data = record[start:end]
+                return data.strip(b' 0') != b'' and compare(data, target)
+            return match
+        if field.type in ('N', 'F') and not flagged:
+            target = float(value.replace(',', '.'))
+            def match(record):
+                data = record[start:end].strip()
+                if not data:
+                    return False
+                try:
+                    return compare(float(data.replace(b',', b'.')), target)
+                except ValueError:
+                    return False
+            return match
+        if field.type == 'L':
+            target = value.strip('.').upper()[:1] in ('T', 'Y', 'S', '1')
+            def match(record):
+                data = record[start:start + 1]
+                if data in b'? ':
+                    return False
+                return compare(data in b'TtYy', target)
+            return match
+        # Resto de tipos (binarios de VFP, campos con _NullFlags): se decodifica solo este campo
+        get = self._value_getter(field)
+        if field.type in ('T', '@'):
+            target = datetime.datetime.fromisoformat(value)
+        elif field.type in ('C', 'V'):
+            target = value.rstrip(' ')
+        else:
+            target = float(value.replace(',', '.'))
+        def match(record):
+            data = get(record)
+            return data is not None and data != '' and compare(data, target)
+        return match
+
+
+class MemoFile:
+    """Archivo de memos (.FPT de FoxPro o .DBT de dBase) sobre mmap.
+
+    Los memos se leen por número de bloque solo cuando se piden. Los
+    pequeños se guardan en una caché LRU de los últimos cache_size bloques
+    leídos; los grandes se pueden recorrer por trozos con iter_chunks sin
+    tenerlos enteros en memoria.
+    """
+
+    def __init__(self, path, dbase_iv=False, cache_size=256):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self.foxpro = path.lower().endswith('.fpt')
+        if self.foxpro:
+            # Siguiente bloque libre (4 bytes) y tamaño de bloque (2 bytes en la posición 6), big-endian
+            self.block_size = struct.unpack_from('>H', self._mm, 6)[0]
+        elif dbase_iv:
+            self.block_size = struct.unpack_from('<H', self._mm, 20)[0] or 512
+        else:
+            self.block_size = 512
+        self.block_size = self.block_size or 512
+        self._cache = OrderedDict()
+        self.cache_size = cache_size
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def _locate(self, block):
+        """Posición y longitud de los datos del memo que empieza en block"""
+        mm = self._mm
+        offset = block * self.block_size
+        if offset >= len(mm):
+            raise ValueError(f"Bloque de memo {block} fuera del archivo {self.path}")
+        if self.foxpro:
+            # Cabecera del bloque: tipo (0 imagen, 1 texto, 2 objeto) y longitud, big-endian
+            _, length = struct.unpack_from('>II', mm, offset)
+            return offset + 8, min(length, len(mm) - offset - 8)
+        if mm[offset:offset + 4] == b'\xff\xff\x08\x00':
+            # dBase IV: la longitud incluye los 8 bytes de cabecera
+            length = struct.unpack_from('<I', mm, offset + 4)[0]
+            return offset + 8, min(max(length - 8, 0), len(mm) - offset - 8)
+        # dBase III: el memo termina en 0x1A
+        end = mm.find(b'\x1a', offset)
+        return offset, (end if end != -1 else len(mm)) - offset
+
+    def length(self, block):
+        return self._locate(block)[1]
+
+    def read(self, block):
+        """Bytes del memo que empieza en block"""
+        cache = self._cache
+        data = cache.get(block)
+        if data is not None:
+            cache.move_to_end(block)
+            return data
+        start, length = self._locate(block)
+        data = self._mm[start:start + length]
+        if length <= MEMO_CACHE_MAX_BYTES:
+            cache[block] = data
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return data
+
+    def iter_chunks(self, block, chunk_size=MEMO_CHUNK_SIZE):
+        """Recorre el memo por trozos de como mucho chunk_size bytes"""
+        start, length = self._locate(block)
+        mm = self._mm
+        for pos in range(start, start + length, chunk_size):
+            yield mm[pos:min(pos + chunk_size, start + length)]
+
+
+class MemoRef:
+    """Memo grande sin leer: se resuelve con read() o se recorre por trozos con chunks()"""
+
+    __slots__ = ('memo', 'block', 'length', 'encoding', 'errors')
+
+    def __init__(self, memo, block, length, encoding=None, errors='replace'):
+        self.memo = memo
+        self.block = block
+        self.length = length
+        # Sin encoding el memo es binario (G, P, W)
+        self.encoding = encoding
+        self.errors = errors
+
+    def read(self):
+        data = self.memo.read(self.block)
+        return data.decode(self.encoding, errors=self.errors) if self.encoding else data
+
+    def chunks(self, chunk_size=MEMO_CHUNK_SIZE):
+        return self.memo.iter_chunks(self.block, chunk_size)
+
+
+def find_memo_file(dbf_path, dbversion):
+    """Busca el .FPT o .DBT de la tabla según su versión; devuelve None si no existe"""
+    base_name = os.path.splitext(dbf_path)[0]
+    ext = 'fpt' if dbversion in FOXPRO_VERSIONS else 'dbt'
+    for candidate in (ext, ext.upper(), ext.capitalize()):
+        if os.path.exists(f"{base_name}.{candidate}"):
+            return f"{base_name}.{candidate}"
+    return None
+
+
+# Decodificación por bloques con numpy: los registros tienen longitud fija, así
+# que un bloque de registros es una matriz de bytes (un registro por fila) y una
+# columna es un corte de esa matriz. Solo se decodifican así los campos con la
+# forma habitual; el resto (válido=False) se deja para el parser de siempre.
+
+# Como mucho estos dígitos: la división entre la potencia de 10 da el mismo float que float()
+NUMERIC_BLOCK_MAX_DIGITS = 15
+
+def decode_numeric_block(block, offset, length):
+    """Decodifica de una vez una columna N/F de un bloque de registros.
+
+    block es la matriz de bytes de DBFReader.record_block. Devuelve arrays
+    de una posición por registro: (enteros, reales, es entero, vacío,
+    válido). Un campo es válido si tiene la forma
+    [espacios][-]dígitos[.dígitos][espacios] (con punto o coma decimal) y
+    como mucho NUMERIC_BLOCK_MAX_DIGITS dígitos; para esos, reales es
+    exactamente el float que daría parse_numeric y enteros su parte entera.
+    Los vacíos (solo espacios) son NULL.
+    """
+    cells = block[:, offset:offset + length]
+    rows = numpy.arange(len(cells))
+    digit = (cells >= 0x30) & (cells <= 0x39)
+    space = cells == 0x20
+    point = (cells == 0x2E) | (cells == 0x2C)
+    minus = cells == 0x2D
+    filled = ~space
+    blank = ~filled.any(axis=1)
+    # Los caracteres que no son espacio tienen que ir seguidos, con el signo delante
+    first = filled.argmax(axis=1)
+    last = length - 1 - filled[:, ::-1].argmax(axis=1)
+    digits = digit.sum(axis=1)
+    minus_count = minus.sum(axis=1)
+    valid = ((digit | space | point | minus).all(axis=1) &
+             (last - first + 1 == filled.sum(axis=1)) &
+             (point.sum(axis=1) <= 1) &
+             ((minus_count == 0) | ((minus_count == 1) & minus[rows, first])) &
+             (digits > 0) & (digits <= NUMERIC_BLOCK_MAX_DIGITS))
+    powers = 10 ** numpy.arange(19, dtype=numpy.int64)
+    # Cada dígito pesa 10 elevado al número de dígitos que tiene a su derecha
+    right = numpy.minimum(digit[:, ::-1].cumsum(axis=1)[:, ::-1] - digit, 18)
+    mantissa = numpy.where(digit, (cells - 0x30) * powers[right], 0).sum(axis=1)
+    scale = (digit & (point.cumsum(axis=1) > 0)).sum(axis=1)
+    divisor = powers[numpy.minimum(scale, 18)]
+    sign = numpy.where(minus_count > 0, -1, 1)
+    integral = mantissa % divisor == 0
+    return sign * (mantissa // divisor), sign * mantissa / divisor, integral, blank, valid
+
+# Días de cada mes (el índice 0 no se usa)
+MONTH_DAYS = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def decode_date_block(block, offset):
+    """Decodifica de una vez una columna D (AAAAMMDD) de un bloque de registros.
+
+    Devuelve (fechas como datetime64[D], vacío, válido), como
+    decode_numeric_block: válidos son los campos con una fecha correcta y
+    vacíos los que solo tienen espacios y ceros (NULL en parse_date).
+    """
+    cells = block[:, offset:offset + 8]
+    digit = (cells >= 0x30) & (cells <= 0x39)
+    blank = ((cells == 0x20) | (cells == 0x30)).all(axis=1)
+    numbers = (cells.astype(numpy.int64) - 0x30) * (10 ** numpy.arange(7, -1, -1, dtype=numpy.int64))
+    year = numbers[:, :4].sum(axis=1) // 10000
+    month = numbers[:, 4:6].sum(axis=1) // 100
+    day = numbers[:, 6:].sum(axis=1)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = numpy.array(MONTH_DAYS)[numpy.clip(month, 0, 12)] + ((month == 2) & leap)
+    valid = digit.all(axis=1) & (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+    # Los campos no válidos se calculan como 1970-01-01 para no salirse del rango de datetime64
+    year = numpy.where(valid, year, 1970)
+    month = numpy.where(valid, month, 1)
+    day = numpy.where(valid, day, 1)
+    dates = ((year - 1970).astype('datetime64[Y]') + (month - 1).astype('timedelta64[M]')).astype('datetime64[D]')
+    return dates + (day - 1).astype('timedelta64[D]'), blank, valid
+
+
+class DBFReader:
+    """Lector de DBF sobre mmap.
+
+    La cabecera y los descriptores de campo se leen una sola vez. Los
+    registros se recorren por desplazamiento fijo y solo se decodifican las
+    columnas pedidas, devolviendo tuplas en lugar de un diccionario por registro.
+    """
+
+    def __init__(self, path, encoding='latin1', char_decode_errors='replace', memo_stream_threshold=None):
+        self.path = path
+        self.encoding = encoding
+        self.char_decode_errors = char_decode_errors
+        # Los memos de más de memo_stream_threshold bytes se devuelven como MemoRef sin leer
+        self.memo_stream_threshold = memo_stream_threshold
+        # Objeto con lap(etapa) (ver RunStats en dbf_to_sql) al que iter_records
+        # pasa el tiempo de lectura ('read') y de decodificación ('decode')
+        self.timer = None
+        # Campos que no se han podido decodificar, por columna
+        self.field_errors = Counter()
+        self._memo = None
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._read_header()
+
+    def _read_header(self):
+        """Lee la cabecera y los descriptores de campo"""
+        mm = self._mm
+        (self.dbversion, year, month, day, numrecords,
+         self.header_length, self.record_length) = struct.unpack_from(HEADER_FORMAT, mm, 0)
+        self.last_update = (year, month, day)
+
+        self.fields = []
+        pos = 32
+        offset = 1  # El primer byte del registro es la marca de borrado
+        while pos + FIELD_DESCRIPTOR_SIZE <= self.header_length and mm[pos] != 0x0D:
+            descriptor = mm[pos:pos + FIELD_DESCRIPTOR_SIZE]
+            name = descriptor[:11].split(b'\0')[0].decode('ascii', errors='replace')
+            type_char = chr(descriptor[11])
+            length = descriptor[16]
+            decimal = descriptor[17]
+            self.fields.append(DBFField(name, type_char, offset, length, decimal, descriptor[18]))
+            offset += length
+            pos += FIELD_DESCRIPTOR_SIZE
+        self._read_null_bits()
+
+        # Si la cabecera dice más registros de los que caben en el archivo, nos quedamos con los reales
+        available = (len(mm) - self.header_length) // self.record_length if self.record_length else 0
+        self.numrecords = max(0, min(numrecords, available))
+
+    def _read_null_bits(self):
+        """Bits de _NullFlags de cada campo: {nombre: (bit de NULL, bit de longitud variable)}.
+
+        En Visual FoxPro cada campo que admite NULL ocupa un bit de
+        _NullFlags, y cada V/Q otro más que indica que el campo no está lleno
+        y su longitud real va en el último byte. Se reparten en orden de campo.
+        """
+        self.nullflags = None
+        self.null_bits = {}
+        for field in self.fields:
+            if field.name == NULLFLAGS_FIELD and field.type == '0':
+                self.nullflags = field
+        if self.nullflags is None:
+            return
+        bit = 0
+        for field in self.fields:
+            if field.flags & FIELD_SYSTEM:
+                continue
+            null_bit = length_bit = None
+            if field.flags & FIELD_NULLABLE:
+                null_bit = bit
+                bit += 1
+            if field.type in VARLENGTH_TYPES:
+                length_bit = bit
+                bit += 1
+            if null_bit is not None or length_bit is not None:
+                self.null_bits[field.name] = (null_bit, length_bit)
+
+    def flagged_parser(self, field, parser):
+        """Envuelve el parser de un campo con bits en _NullFlags.
+
+        Recibe el registro entero en lugar del campo: con el bit de NULL
+        activo devuelve None y con el de longitud variable recorta el campo
+        a la longitud guardada en su último byte.
+        """
+        null_bit, length_bit = self.null_bits[field.name]
+        flags_start = self.nullflags.offset
+        flags_end = flags_start + self.nullflags.length
+        start = field.offset
+        end = start + field.length
+
+        def parse_flagged(record, decode):
+            flags = int.from_bytes(record[flags_start:flags_end], 'little')
+            if null_bit is not None and flags >> null_bit & 1:
+                return None
+            data = record[start:end]
+            if length_bit is not None and flags >> length_bit & 1:
+                data = data[:data[-1]]
+            return parser(data, decode)
+        return parse_flagged
+
+    def close(self):
+        if self._memo:
+            self._memo.close()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def memo_file(self):
+        """Abre el archivo de memos la primera vez que se pide una columna de memo"""
+        if self._memo is None:
+            memo_path = find_memo_file(self.path, self.dbversion)
+            if memo_path is None:
+                print(f"Aviso: no se encontró el archivo de memos de {self.path}; los memos quedan a NULL")
+                self._memo = False
+            else:
+                self._memo = MemoFile(memo_path, dbase_iv=self.dbversion in DBASE_IV_VERSIONS)
+        return self._memo
+
+    def memo_parser(self, field):
+        """Parser de una columna de memo: el campo guarda el número de bloque"""
+        memo = self.memo_file()
+        if not memo:
+            return parse_none
+        binary_block = field.length == 4  # Visual FoxPro: entero de 4 bytes; si no, 10 dígitos
+        text = field.type == 'M'
+        threshold = self.memo_stream_threshold
+        encoding = self.encoding if text else None
+        errors = self.char_decode_errors
+
+        def parse_memo(data, decode):
+            block = int.from_bytes(data, 'little') if binary_block else int(data.strip() or 0)
+            if not block:
+                return None
+            if threshold is not None:
+                length = memo.length(block)
+                if length > threshold:
+                    return MemoRef(memo, block, length, encoding, errors)
+            value = memo.read(block)
+            return decode(value) if text else value
+        return parse_memo
+
+    def field_names(self):
+        return [field.name for field in self.fields]
+
+    def compile_where(self, expression):
+        """Función registro -> bool para iter_records(where=...) a partir de una expresión --where"""
+        return WhereParser(self, expression).compile()
+
+    def record_offset(self, index):
+        """Posición en el archivo del registro index (0 = primero)"""
+        return self.header_length + index * self.record_length
+
+    def record_block(self, start, stop):
+        """Registros [start, stop) como matriz de bytes de numpy, un registro por fila.
+
+        Es una copia y no una vista del mmap, para que el archivo se pueda
+        cerrar aunque quede alguna matriz viva.
+        """
+        data = self._mm[self.record_offset(start):self.record_offset(stop)]
+        return numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, self.record_length)
+
+    def deleted_count(self):
+        """Número de registros marcados como borrados ('*'), sin decodificar ninguno"""
+        # Un corte con paso record_length devuelve solo los bytes de marca de cada registro
+        flags = self._mm[self.header_length:self.record_offset(self.numrecords):self.record_length]
+        return flags.count(b'*')
+
+    def decode(self, data):
+        return data.decode(self.encoding, errors=self.char_decode_errors)
+
+    def column_plan(self, field_names, raw_text=()):
+        """Precalcula (inicio, fin, parser) de cada columna pedida.
+
+        Las columnas de texto (C, V) cuyo nombre está en raw_text se entregan
+        como bytes sin decodificar.
+        """
+        by_name = {field.name: field for field in self.fields}
+        plan = []
+        for name in field_names:
+            field = by_name.get(name)
+            if field is None:
+                plan.append((0, 0, parse_none))
+                continue
+            if name in raw_text and field.type in ('C', 'V'):
+                parser = parse_raw_text
+            elif field.type in MEMO_TYPES:
+                parser = self.memo_parser(field)
+            else:
+                parser = FIELD_PARSERS.get(field.type, parse_none)
+            if name in self.null_bits:
+                # El parser necesita también los bits de _NullFlags: recibe el registro entero
+                plan.append((0, self.record_length, self.flagged_parser(field, parser)))
+            else:
+                plan.append((field.offset, field.offset + field.length, parser))
+        return plan
+
+    def _decode_fields_safe(self, record, plan, field_names, index):
+        """Decodifica campo a campo; los campos erróneos quedan a None"""
+        values = []
+        for name, (start, stop, parser) in zip(field_names, plan):
+            try:
+                values.append(parser(record[start:stop], self.decode))
+            except ValueError as e:
+                print(f"Error en campo {name} del registro {index}: {str(e)}")
+                self.field_errors[name] += 1
+                values.append(None)
+        return tuple(values)
+
+    def iter_records(self, field_names=None, start=0, stop=None, raw_text=(), with_index=False,
+                     deleted=False, where=None):
+        """Devuelve una tupla por registro no borrado con los campos pedidos, en ese orden.
+
+        start y stop limitan el recorrido a los registros [start, stop) por
+        número de registro físico (incluidos los borrados). Las columnas de
+        texto incluidas en raw_text se devuelven como bytes (ver column_plan).
+        Con with_index se devuelve (número de registro, tupla), numerando desde
+        1 como RECNO() en xBase. Con deleted=True se devuelven solo los
+        registros borrados en lugar de los activos. La marca de borrado se
+        mira antes de decodificar nada, así que los registros descartados no
+        cuestan más que leer un byte. where (ver compile_where) filtra los
+        registros sobre sus bytes, también antes de decodificarlos.
+        """
+        if field_names is None:
+            field_names = self.field_names()
+        if stop is None or stop > self.numrecords:
+            stop = self.numrecords
+        plan = self.column_plan(field_names, raw_text)
+        decode = self.decode
+        mm = self._mm
+        record_length = self.record_length
+        offset = self.record_offset(start)
+        end = self.record_offset(stop)
+
+        lap = self.timer.lap if self.timer is not None else None
+        wanted = 0x2A if deleted else 0x20  # '*' borrado, ' ' activo
+        index = start
+        while offset < end:
+            flag = mm[offset]
+            index += 1
+            if flag == wanted:
+                record = mm[offset:offset + record_length]
+                if where is None or where(record):
+                    if lap is not None:
+                        lap('read')
+                    try:
+                        values = tuple([parser(record[begin:finish], decode) for begin, finish, parser in plan])
+                    except ValueError:
+                        values = self._decode_fields_safe(record, plan, field_names, index)
+                    if lap is not None:
+                        lap('decode')
+                    yield (index, values) if with_index else values
+            elif flag == 0x1A:  # Marca de fin de archivo
+                break
+            offset += record_length
+
+    def iter_records_at(self, recnos, field_names=None, raw_text=(), with_index=False, where=None):
+        """Como iter_records, pero recorriendo los números de registro (desde 1) de recnos en ese orden.
+
+        Sirve para exportar en el orden de un índice. Los registros borrados y
+        los números fuera del archivo se saltan.
+        """
+        if field_names is None:
+            field_names = self.field_names()
+        plan = self.column_plan(field_names, raw_text)
+        decode = self.decode
+        mm = self._mm
+        record_length = self.record_length
+        header_length = self.header_length
+        numrecords = self.numrecords
+        lap = self.timer.lap if self.timer is not None else None
+
+        for index in recnos:
+            if not 0 < index <= numrecords:
+                continue
+            offset = header_length + (index - 1) * record_length
+            if mm[offset] != 0x20:  # Solo registros activos
+                continue
+            record = mm[offset:offset + record_length]
+            if where is not None and not where(record):
+                continue
+            if lap is not None:
+                lap('read')
+            try:
+                values = tuple([parser(record[begin:finish], decode) for begin, finish, parser in plan])
+            except ValueError:
+                values = self._decode_fields_safe(record, plan, field_names, index)
+            if lap is not None:
+                lap('decode')
+            yield (index, values) if with_index else values
@@ -17,8 +17,11 @@ try:
     # Obtenemos la estructura básica
     estructura = []
     for field in tabla.fields:
-        # Simplemente guardamos nombre, tipo y longitud
-        estructura.append(f"'{field.name} {field.type}({field.length})'")
+        # Guardamos nombre, tipo, longitud y decimales (si los hay)
+        if field.decimal_count:
+            estructura.append(f"'{field.name} {field.type}({field.length},{field.decimal_count})'")
+        else:
+            estructura.append(f"'{field.name} {field.type}({field.length})'")
     
     # Creamos el nombre del archivo de salida
     nombre_archivo = f"{nombre_tabla}.txt"
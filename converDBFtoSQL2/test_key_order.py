@@ -0,0 +1,76 @@
+"""Orden y rangos de las etiquetas del .CDX (key_order) sobre el contenid.CDX de
+ejemplo. Se ejecuta con python -m unittest test_key_order (o con pytest)
+desde esta carpeta."""
+import contextlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from cdx_reader import CDXIndex
+from dbf_to_sql import key_order
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'convert dbf to sql')
+
+
+class KeyOrderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name in ('contenid.DBF', 'contenid.CDX'):
+            shutil.copy(os.path.join(SAMPLE_DIR, name), self.tmp.name)
+        self.dbf_path = os.path.join(self.tmp.name, 'contenid.DBF')
+        self.cdx_path = os.path.join(self.tmp.name, 'contenid.CDX')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def key_order(self, tag_name, key_range=None):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            recnos = key_order(self.dbf_path, tag_name, key_range)
+        return recnos, output.getvalue()
+
+    def patch_tag(self, tag_name, offset, fmt, value):
+        """Cambia un campo de la cabecera de la etiqueta en la copia del .CDX"""
+        with CDXIndex(self.cdx_path) as index:
+            position = index.tag(tag_name).offset + offset
+        with open(self.cdx_path, 'r+b') as f:
+            f.seek(position)
+            f.write(struct.pack(fmt, value))
+
+    def test_repeated_records_are_exported_once(self):
+        # NUM_REF depende de DATE(): el índice tiene entradas de más para algunos registros
+        with CDXIndex(self.cdx_path) as index:
+            entries = index.record_numbers('NUM_REF')
+        self.assertGreater(len(entries), len(set(entries)))
+        recnos, output = self.key_order('NUM_REF')
+        self.assertEqual(recnos, list(dict.fromkeys(entries)))
+        self.assertIn('repiten un registro', output)
+
+    def test_range(self):
+        recnos, _ = self.key_order('ORDRE', ('300100', '300110'))
+        all_recnos, output = self.key_order('ORDRE')
+        self.assertEqual(len(recnos), 11)
+        self.assertEqual(len(all_recnos), len(set(all_recnos)))
+        self.assertNotIn('repiten un registro', output)
+        start = all_recnos.index(recnos[0])
+        self.assertEqual(all_recnos[start:start + 11], recnos)
+
+    def test_descending(self):
+        ascending, _ = self.key_order('ORDRE', ('300100', '300110'))
+        whole, _ = self.key_order('CONT')
+        self.patch_tag('ORDRE', 502, '<H', 1)
+        self.patch_tag('CONT', 502, '<H', 1)
+        self.assertEqual(self.key_order('ORDRE', ('300100', '300110'))[0], ascending[::-1])
+        self.assertEqual(self.key_order('CONT')[0], whole[::-1])
+
+    def test_range_with_other_key_width(self):
+        # Una etiqueta numérica con claves de 4 bytes no se puede comparar con el double de 8
+        self.patch_tag('ORDRE', 12, '<H', 4)
+        with self.assertRaises(ValueError):
+            self.key_order('ORDRE', ('300100', '300110'))
+
+
+if __name__ == '__main__':
+    unittest.main()
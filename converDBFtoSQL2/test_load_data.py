@@ -0,0 +1,162 @@
+"""El TSV de --load-data, leído como lo lee LOAD DATA, tiene que dar los mismos
+valores que los INSERT de la misma tabla. Se ejecuta con
+python -m unittest test_load_data (o con pytest) desde esta carpeta."""
+import contextlib
+import io
+import os
+import struct
+import tempfile
+import unittest
+from dbf_to_sql import dbf_to_load_data, dbf_to_sql, load_structure, sql_literal_to_tsv
+
+FIELDS = [('CODI', 'N', 6, 0), ('NOM', 'C', 20, 0), ('DATA', 'D', 8, 0), ('OBS', 'M', 10, 0)]
+
+# Texto con lo que el TSV tiene que escapar: tabuladores, saltos de línea,
+# barras invertidas, \N literal, NUL y comillas; None es un memo sin bloque
+ROWS = [
+    ('1', 'normal', '20240131', 'línea 1\nlínea 2\r\n\tcon tabulador'),
+    ('2', 'a\tb', '', 'C:\\ruta\\archivo\\'),
+    ('3', 'barra\\', '20240229', '\\N'),
+    ('4', '', '', None),
+    ('5', "O'Brien", '00000000', '   \n\t  '),
+    ('', '\\N', '20241231', "'entre comillas' y \\'escapadas\\'"),
+    ('7', 'nul\x00medio', '', 'fin con barra\\\n'),
+    ('8', 'ñandú', '', ('bloque\t\\largo\n' * 300) + "'"),
+    ('9', "'", '', '\\'),
+]
+
+
+def write_dbf(path, fields, rows):
+    """DBF de dBase III con memos en Nombre.dbt (bloques de 512 bytes terminados en 0x1A)"""
+    memo = bytearray(512)
+    record_length = 1 + sum(length for _, _, length, _ in fields)
+    header_length = 32 + 32 * len(fields) + 1
+    data = bytearray(struct.pack('<BBBBIHH', 0x83, 124, 1, 1, len(rows), header_length, record_length))
+    data += bytes(20)
+    for name, type_char, length, decimal in fields:
+        data += name.encode('ascii').ljust(11, b'\0') + type_char.encode('ascii') + bytes(4)
+        data += bytes([length, decimal]) + bytes(14)
+    data += b'\r'
+    for row in rows:
+        data += b' '
+        for (_, type_char, length, _), value in zip(fields, row):
+            if type_char == 'M':
+                block = 0
+                if value is not None:
+                    block = len(memo) // 512
+                    memo += value.encode('latin1') + b'\x1a\x1a'
+                    memo += bytes(-len(memo) % 512)
+                value = str(block) if block else ''
+            raw = value.encode('latin1')
+            data += (raw.rjust(length) if type_char == 'N' else raw.ljust(length))[:length]
+    data += b'\x1a'
+    struct.pack_into('<I', memo, 0, len(memo) // 512)
+    with open(path, 'wb') as f:
+        f.write(data)
+    with open(os.path.splitext(path)[0] + '.dbt', 'wb') as f:
+        f.write(memo)
+
+def parse_inserts(path):
+    """Filas de los INSERT de una fila por sentencia: None para NULL y el texto del literal"""
+    rows = []
+    with open(path, encoding='utf8') as f:
+        for line in f:
+            if not line.startswith('INSERT INTO'):
+                continue
+            values = line[line.index(' VALUES (') + 9:line.rindex(');')]
+            row = []
+            pos = 0
+            while pos < len(values):
+                if values[pos] == "'":
+                    end = pos + 1
+                    while True:
+                        end = values.index("'", end)
+                        if values[end + 1:end + 2] != "'":
+                            break
+                        end += 2
+                    row.append(values[pos + 1:end].replace("''", "'"))
+                    pos = end + 1
+                else:
+                    end = values.find(',', pos)
+                    end = len(values) if end == -1 else end
+                    token = values[pos:end]
+                    row.append(None if token == 'NULL' else token)
+                    pos = end
+                pos += 2  # ', '
+            rows.append(row)
+    return rows
+
+def unescape_tsv(field):
+    """Valor de un campo del TSV como lo lee LOAD DATA con ESCAPED BY '\\'"""
+    if field == '\\N':
+        return None
+    escapes = {'t': '\t', 'n': '\n', 'r': '\r', '0': '\x00', '\\': '\\'}
+    out = []
+    pos = 0
+    while pos < len(field):
+        char = field[pos]
+        if char == '\\' and pos + 1 < len(field):
+            pos += 1
+            char = escapes.get(field[pos], field[pos])
+        out.append(char)
+        pos += 1
+    return ''.join(out)
+
+def parse_tsv(path):
+    with open(path, encoding='utf8', newline='') as f:
+        data = f.read()
+    assert data.endswith('\n')
+    # Los saltos de línea y tabuladores de los datos van escapados
+    return [[unescape_tsv(field) for field in line.split('\t')] for line in data[:-1].split('\n')]
+
+
+class LoadDataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dbf_path = os.path.join(self.tmp.name, 'prueba.dbf')
+        write_dbf(self.dbf_path, FIELDS, ROWS)
+        self.field_specs = load_structure(self.dbf_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def convert(self, memo_stream_threshold=None):
+        """(filas de los INSERT, filas del TSV) de la tabla de prueba"""
+        sql_path = os.path.join(self.tmp.name, 'inserts.sql')
+        load_path = os.path.join(self.tmp.name, 'load.sql')
+        data_path = os.path.join(self.tmp.name, 'prueba.tsv')
+        with contextlib.redirect_stdout(io.StringIO()):
+            dbf_to_sql(self.dbf_path, sql_path, 'prueba', self.field_specs)
+            dbf_to_load_data(self.dbf_path, load_path, data_path, 'prueba', self.field_specs,
+                             memo_stream_threshold=memo_stream_threshold)
+        return parse_inserts(sql_path), parse_tsv(data_path)
+
+    def test_structure(self):
+        self.assertEqual(self.field_specs, FIELDS)
+
+    def test_tsv_matches_inserts(self):
+        inserts, tsv = self.convert()
+        self.assertEqual(len(inserts), len(ROWS))
+        self.assertEqual(tsv, inserts)
+        # Algunos campos quedan a NULL en las dos salidas
+        self.assertIn(None, [value for row in tsv for value in row])
+
+    def test_streamed_memos_match_inserts(self):
+        inserts, tsv = self.convert(memo_stream_threshold=16)
+        self.assertEqual(tsv, inserts)
+
+    def test_tsv_escapes(self):
+        # La limpieza ya quita tabuladores, saltos y barras del texto, pero el
+        # escape del TSV tiene que ser reversible para cualquier literal
+        self.assertIsNone(unescape_tsv(sql_literal_to_tsv('NULL')))
+        for value in ['a\tb', 'a\nb\r\n', '\\', '\\N', 'N', '\\0', '\x00', "'", "it's",
+                      'ñ\t\\\n\x00\'', '12.5', '']:
+            tsv = sql_literal_to_tsv("'" + value.replace("'", "''") + "'")
+            self.assertNotIn('\t', tsv)
+            self.assertNotIn('\n', tsv)
+            self.assertEqual(unescape_tsv(tsv), value, repr(value))
+
+
+if __name__ == '__main__':
+    unittest.main()
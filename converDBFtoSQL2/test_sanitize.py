@@ -0,0 +1,95 @@
+"""La limpieza de texto en una pasada (clean_text) tiene que dar lo mismo que la
+cadena de replace() anterior. Se ejecuta con python -m unittest test_sanitize
+(o con pytest) desde esta carpeta."""
+import random
+import unittest
+from dbf_to_sql import (clean_text, clean_text_chunks, sanitize_value, make_text_converter,
+                        make_raw_text_converter)
+
+# Caracteres que tocan alguna regla de la limpieza, más texto normal
+ALPHABET = ['a', 'b', 'Z', '7', 'ñ', 'é', 'Ç', ' ', ' ', '\t', '\r', '\n', '\x00', '\x0b', '\x0c',
+            '\x1f', '\\', "'", '"', '\u00a0', '\u2003', '\u3000']
+
+
+def old_clean(value):
+    """La cadena de replace() que había antes de clean_text (sanitize_value y make_text_converter)"""
+    clean_value = value.replace('\\', '')
+    clean_value = clean_value.replace("'", "''")
+    clean_value = clean_value.replace('\x00', '')
+    clean_value = clean_value.replace('\r', ' ')
+    clean_value = clean_value.replace('\n', ' ')
+    clean_value = ' '.join(clean_value.split())
+    clean_value = clean_value.strip()
+    return clean_value.rstrip("'\\")
+
+def old_sanitize_text(value, type_char):
+    """Rama de texto de sanitize_value antes de clean_text"""
+    if not value or str(value).strip() == '':
+        return 'NULL'
+    clean_value = old_clean(str(value))
+    if not clean_value:
+        return 'NULL'
+    if type_char == 'C' and len(clean_value) > 255:
+        clean_value = clean_value[:255]
+    return f"'{clean_value}'"
+
+def random_text(rng):
+    length = rng.choice([0, 1, 2, 3, 5, 10, 40, 253, 254, 255, 256, 257, 300])
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+def boundary_texts():
+    """Textos cuya limpieza acaba justo alrededor de los 255 caracteres del corte de los C"""
+    texts = []
+    for size in (252, 253, 254, 255, 256):
+        for tail in ("'", "''", "'x", "x'", "\\'", " '", "'  ", "\x00'", "\r\n'"):
+            texts.append('a' * size + tail)
+            texts.append("'" + 'b' * size + tail)
+            texts.append('a ' * (size // 2) + tail)
+    return texts
+
+def cases():
+    rng = random.Random(20241126)
+    fixed = ['', ' ', '   ', "'", "''", "'''", '\\', '\\\\', '\x00', '\x00\x00', '\r\n', "a'b",
+             "a''b", "a\\'b", "'a'", "  a  b  ", "a\tb\nc\rd", "fin'  ", "fin' '", "\\'\\'",
+             "O'Brien", 'C:\\ruta\\archivo', "a\x00'\x00", '\u00a0a\u2003b\u3000']
+    return fixed + boundary_texts() + [random_text(rng) for _ in range(5000)]
+
+
+class CleanTextTest(unittest.TestCase):
+
+    def test_clean_text(self):
+        for value in cases():
+            self.assertEqual(clean_text(value), old_clean(value), repr(value))
+
+    def test_sanitize_value(self):
+        for value in cases():
+            for type_char in ('C', 'M'):
+                self.assertEqual(sanitize_value(value, type_char), old_sanitize_text(value, type_char),
+                                 repr(value))
+
+    def test_text_converter(self):
+        converters = {type_char: make_text_converter(type_char) for type_char in ('C', 'V', 'M')}
+        for value in cases():
+            for type_char, convert in converters.items():
+                self.assertEqual(convert(value), old_sanitize_text(value, type_char), repr(value))
+
+    def test_raw_text_converter(self):
+        # Como llegan de DBFReader en modo bytes: sin espacios ni nulos al final
+        decode = lambda data: data.decode('latin1')
+        converters = {type_char: make_raw_text_converter(type_char, decode) for type_char in ('C', 'V')}
+        for value in cases():
+            data = value.encode('latin1', errors='replace').rstrip(b'\0 ')
+            for type_char, convert in converters.items():
+                self.assertEqual(convert(data), old_sanitize_text(decode(data), type_char), repr(value))
+
+    def test_clean_text_chunks(self):
+        rng = random.Random(7)
+        for value in cases():
+            cuts = sorted(rng.sample(range(len(value) + 1), min(len(value) + 1, rng.randint(1, 6))))
+            chunks = [value[start:stop] for start, stop in zip([0] + cuts, cuts + [len(value)])]
+            expected = clean_text(value).replace("''", "'")
+            self.assertEqual(''.join(clean_text_chunks(chunks)), expected, repr(chunks))
+
+
+if __name__ == '__main__':
+    unittest.main()
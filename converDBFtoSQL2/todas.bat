@@ -0,0 +1,2 @@
+echo off
+python dbf_to_sql.py --dir .